@@ -7,12 +7,12 @@ from datetime import date
 from typing import List, Literal, Annotated, Union, Optional, Any, Dict
 from enum import Enum
 from decimal import Decimal
+import threading
 from pydantic import (
     field_validator,
     model_validator,
     ConfigDict,
     BaseModel,
-    validator,
     Field,
     RootModel,
     computed_field,
@@ -269,15 +269,16 @@ class GainAmount(BaseModel):
 
 
 duplicates = {}
+# Reports are generated concurrently in the web server's threadpool
+duplicates_lock = threading.Lock()
 
 
 def get_id(values: Dict[str, Any]):
     """Get id"""
     d = values.source + str(values.date)
-    if d in duplicates:
-        duplicates[d] += 1
-    else:
-        duplicates[d] = 1
+    with duplicates_lock:
+        duplicates[d] = duplicates.get(d, 0) + 1
+        n = duplicates[d]
 
     id = f"{values.type} {str(values.date)}"
     try:
@@ -285,16 +286,15 @@ def get_id(values: Dict[str, Any]):
             id += " " + str(values.qty)
     except AttributeError:
         pass
-    return id + ":" + str(duplicates[d])
+    return id + ":" + str(n)
 
 
 class TransactionEntry(BaseModel):
     @model_validator(mode="after")
-    @classmethod
-    def validate_id(cls, v, info):
+    def validate_id(self):
         """Validate id"""
-        v.id = get_id(v)
-        return v
+        self.id = get_id(self)
+        return self
 
 
 class Buy(TransactionEntry):
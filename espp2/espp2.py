@@ -8,17 +8,13 @@ import os
 import logging
 from enum import Enum
 import typer
-import math
 from rich.logging import RichHandler
 from pydantic import TypeAdapter
 from espp2.main import (
-    do_taxes,
+    run,
     console,
-    get_zipdata,
 )
-from espp2.datamodels import Holdings, Wires
 from espp2.report import print_report
-from espp2._version import __version__
 from espp2.util import FeatureFlagEnum
 
 app = typer.Typer(pretty_exceptions_enable=False)
@@ -32,17 +28,17 @@ class BrokerEnum(str, Enum):
     schwab_individual = "schwab-individual"
 
 
-logger = logging.getLogger(__name__)
-
-
 def version_callback(value: bool):
     if value:
+        # Generated by setuptools_scm, only needed for --version
+        from espp2._version import __version__  # pylint: disable=import-outside-toplevel
+
         typer.echo(f"espp2 CLI Version: {__version__}")
         raise typer.Exit()
 
 
 @app.command()
-def main(  # noqa: C901
+def main(
     transaction_files: list[typer.FileBinaryRead],
     output: typer.FileBinaryWrite = None,
     year: int = 2024,
@@ -52,6 +48,7 @@ def main(  # noqa: C901
     outholdings: typer.FileTextWrite = None,
     outwires: typer.FileTextWrite = None,
     verbose: bool = False,
+    pretty: bool = typer.Option(False, help="Indent JSON output files"),
     portfolio_engine: bool = True,
     features: list[FeatureFlagEnum] = typer.Option([], help="Features to enable"),
     loglevel: str = typer.Option("WARNING", help="Logging level"),
@@ -68,55 +65,24 @@ def main(  # noqa: C901
         level=lognames[loglevel], handlers=[RichHandler(rich_tracebacks=False)]
     )
 
-    result = None
-
-    result = do_taxes(
-        broker,
+    result = run(
         transaction_files,
-        inholdings,
-        wires,
         year,
+        broker=broker,
+        wires=wires,
+        inholdings=inholdings,
+        outholdings=outholdings,
+        outwires=outwires,
+        output=output,
         portfolio_engine=portfolio_engine,
         verbose=verbose,
-        feature_flags=features
+        feature_flags=features,
+        indent=4 if pretty else None,
     )
     print_report(year, result.summary, result.report, result.holdings, verbose)
-
-    # New holdings
-    if outholdings:
-        holdings = result.holdings if result else holdings
-        logger.info("Writing new holdings to %s", outholdings.name)
-        j = holdings.model_dump_json(indent=4)
-        with outholdings as f:
-            f.write(j)
-    else:
+    if not outholdings:
         console.print("No new holdings file specified", style="bold red")
-    if outwires and result and result.report and result.report.unmatched_wires:
-        logger.info("Writing unmatched wires to %s", outwires.name)
-        outw = Wires(result.report.unmatched_wires)
-        for w in outw:
-            w.nok_value = math.nan
-            w.value = abs(w.value)
-        j = outw.model_dump_json(indent=4)
-        with outwires as f:
-            f.write(j)
-
-    # Tax report (in ZIP)
-    if output:
-        j = result.report.model_dump_json(indent=4)
-        logger.info("Writing tax report to: %s", output.name)
-        zipdata = get_zipdata(
-            [
-                (
-                    f"espp-holdings-{year}.json",
-                    result.holdings.model_dump_json(indent=4),
-                ),
-                (f"espp-portfolio-{year}.xlsx", result.excel),
-            ]
-        )
 
-        with output as f:
-            f.write(zipdata)
 
 if __name__ == "__main__":
     app()
@@ -9,6 +9,8 @@ caches them in a set of JSON files.
 
 import os
 import json
+import tempfile
+import threading
 from importlib import resources
 from enum import Enum
 from datetime import date, datetime, timedelta
@@ -16,6 +18,7 @@ from typing import Union, Tuple
 import logging
 from decimal import Decimal
 import math
+import orjson
 import urllib3
 from pydantic import BaseModel
 
@@ -114,8 +117,16 @@ class FMV:
                 FMVTypeEnum.DIVIDENDS: {},
                 FMVTypeEnum.FUNDAMENTALS: {},
             }
+            # The web server computes reports in parallel threads
+            cls._locks = {}
+            cls._locks_lock = threading.Lock()
         return cls._instance
 
+    def _lock(self, fmvtype: FMVTypeEnum, symbol) -> threading.Lock:
+        """Get the lock serializing refreshes of one data file"""
+        with self._locks_lock:
+            return self._locks.setdefault((fmvtype, symbol), threading.Lock())
+
     def fetch_stock(self, symbol):
         """Returns a dictionary of date and closing value from AlphaVantage"""
         http = urllib3.PoolManager()
@@ -127,7 +138,7 @@ class FMV:
         r = http.request("GET", url)
         if r.status != 200:
             raise FMVException(f"Fetching stock data for {symbol} failed {r.status}")
-        raw = json.loads(r.data.decode("utf-8"))
+        raw = orjson.loads(r.data)
         return {k: float(v["4. close"]) for k, v in raw["Time Series (Daily)"].items()}
 
     def fetch_stock2(self, symbol):
@@ -139,7 +150,7 @@ class FMV:
         r = http.request("GET", url)
         if r.status != 200:
             raise FMVException(f"Fetching stock data for {symbol} failed {r.status}")
-        raw = json.loads(r.data.decode("utf-8"))
+        raw = orjson.loads(r.data)
         return {r["date"]: r["close"] for r in raw}
 
     def fetch_currency(self, currency):
@@ -162,7 +173,11 @@ class FMV:
                 continue  # Skip header and blank lines
             fields = line.strip().split(";")
             d = fields[-2]
-            cur[d] = float(fields[-1])
+            rate = float(fields[-1])
+            if not math.isfinite(rate):
+                # No rate that day, lookups fall back to an earlier date
+                continue
+            cur[d] = rate
         return cur
 
     def fetch_dividends(self, symbol):
@@ -177,7 +192,7 @@ class FMV:
             raise FMVException(
                 f"Fetching dividends data for {symbol} failed {r.status}"
             )
-        raw = json.loads(r.data.decode("utf-8"))
+        raw = orjson.loads(r.data)
         r = {}
         for element in raw:
             d = element["paymentDate"] if element["paymentDate"] else element["date"]
@@ -195,7 +210,7 @@ class FMV:
             raise FMVException(
                 f"Fetching fundamentals data for {symbol} failed {r.status}"
             )
-        raw = json.loads(r.data.decode("utf-8"))
+        raw = orjson.loads(r.data)
         return raw
 
     def get_filename(self, fmvtype: FMVTypeEnum, symbol):
@@ -205,8 +220,8 @@ class FMV:
     def load(self, fmvtype: FMVTypeEnum, symbol):
         """Load data for symbol"""
         filename = self.get_filename(fmvtype, symbol)
-        with open(filename, "r", encoding="utf-8") as f:
-            self.table[fmvtype][symbol] = json.load(f)
+        with open(filename, "rb") as f:
+            self.table[fmvtype][symbol] = orjson.loads(f.read())
 
     def need_refresh(self, fmvtype: FMVTypeEnum, symbol, d: datetime.date):
         """Check if we need to refresh data for symbol"""
@@ -223,25 +238,41 @@ class FMV:
         if not self.need_refresh(fmvtype, symbol, d):
             return
 
-        filename = self.get_filename(fmvtype, symbol)
-
-        # Try loading from cache
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                self.table[fmvtype][symbol] = json.load(f)
-                if not self.need_refresh(fmvtype, symbol, d):
-                    return
-        except IOError:
-            pass
-
-        data = self.fetchers[fmvtype](self, symbol)
+        with self._lock(fmvtype, symbol):
+            # Another thread may have refreshed while we waited for the lock
+            if not self.need_refresh(fmvtype, symbol, d):
+                return
 
-        logging.info("Caching data for %s to %s", symbol, filename)
-        data["fetched"] = str(date.today())
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+            filename = self.get_filename(fmvtype, symbol)
 
-        self.table[fmvtype][symbol] = data
+            # Try loading from cache
+            try:
+                with open(filename, "rb") as f:
+                    self.table[fmvtype][symbol] = orjson.loads(f.read())
+                    if not self.need_refresh(fmvtype, symbol, d):
+                        return
+            except IOError:
+                pass
+
+            data = self.fetchers[fmvtype](self, symbol)
+
+            logging.info("Caching data for %s to %s", symbol, filename)
+            data["fetched"] = str(date.today())
+            # Replace the cache file atomically, so that readers (also in other
+            # worker processes) never see a partially written file
+            fd, tmpname = tempfile.mkstemp(
+                dir=os.path.dirname(filename), suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(orjson.dumps(data))
+                os.chmod(tmpname, 0o644)
+                os.replace(tmpname, filename)
+            except BaseException:
+                os.unlink(tmpname)
+                raise
+
+            self.table[fmvtype][symbol] = data
 
     def extract_date(
         self, input_date: Union[str, datetime, datetime.date]
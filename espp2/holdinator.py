@@ -11,7 +11,6 @@ from rich.logging import RichHandler
 from espp2.main import (
     do_holdings,
 )
-from espp2._version import __version__
 
 app = typer.Typer(pretty_exceptions_enable=False)
 
@@ -30,6 +29,8 @@ logger = logging.getLogger(__name__)
 
 def version_callback(value: bool):
     if value:
+        from espp2._version import __version__  # pylint: disable=import-outside-toplevel
+
         typer.echo(f"holdinator CLI Version: {__version__}")
         raise typer.Exit()
 
@@ -3,13 +3,15 @@ ESPPv2 main entry point
 """
 
 # pylint: disable=invalid-name
+import os
 import logging
 import zipfile
+from contextlib import ExitStack, nullcontext
 from io import BytesIO
 from decimal import Decimal
 from typing import Tuple, NamedTuple
 import datetime
-from math import isclose
+from math import isclose, nan
 import simplejson as json
 from espp2.console import console
 from espp2.positions import Positions, InvalidPositionException, Ledger
@@ -424,3 +426,89 @@ def do_taxes(
         verbose=verbose,
         feature_flags=feature_flags,
     )
+
+
+def _file(file, mode):
+    """Open a file given by name. Files opened by the caller are left open."""
+    if isinstance(file, (str, os.PathLike)):
+        encoding = None if "b" in mode else "utf-8"
+        return open(file, mode, encoding=encoding)
+    return nullcontext(file)
+
+
+def run(
+    transaction_files: list,
+    year: int,
+    broker: str = "schwab",
+    wires=None,
+    inholdings=None,
+    outholdings=None,
+    outwires=None,
+    output=None,
+    portfolio_engine=True,
+    verbose=False,
+    feature_flags=[],
+    indent=None,
+) -> TaxReportReturn:
+    """Calculate taxes for a year and write the requested output files.
+
+    Library entry point doing what the espp2 CLI does, without the command
+    line parsing. Lets scripts run many years in a single interpreter.
+    Input and output files can be given as file names or open files.
+    """
+    with ExitStack() as stack:
+        transaction_files = [
+            stack.enter_context(_file(tf, "rb")) for tf in transaction_files
+        ]
+        if wires is not None:
+            wires = stack.enter_context(_file(wires, "r"))
+        if inholdings is not None:
+            inholdings = stack.enter_context(_file(inholdings, "r"))
+        result = do_taxes(
+            broker,
+            transaction_files,
+            inholdings,
+            wires,
+            year,
+            portfolio_engine=portfolio_engine,
+            verbose=verbose,
+            feature_flags=feature_flags,
+        )
+
+    # New holdings
+    if outholdings:
+        logger.info(
+            "Writing new holdings to %s", getattr(outholdings, "name", outholdings)
+        )
+        with _file(outholdings, "w") as f:
+            f.write(result.holdings.model_dump_json(indent=indent))
+
+    if outwires and result.report.unmatched_wires:
+        logger.info(
+            "Writing unmatched wires to %s", getattr(outwires, "name", outwires)
+        )
+        outw = Wires(
+            [
+                w.model_copy(update={"nok_value": nan, "value": abs(w.value)})
+                for w in result.report.unmatched_wires
+            ]
+        )
+        with _file(outwires, "w") as f:
+            f.write(outw.model_dump_json(indent=indent))
+
+    # Tax report (in ZIP)
+    if output:
+        logger.info("Writing tax report to: %s", getattr(output, "name", output))
+        zipdata = get_zipdata(
+            [
+                (
+                    f"espp-holdings-{year}.json",
+                    result.holdings.model_dump_json(indent=indent),
+                ),
+                (f"espp-portfolio-{year}.xlsx", result.excel),
+            ]
+        )
+        with _file(output, "wb") as f:
+            f.write(zipdata)
+
+    return result
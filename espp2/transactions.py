@@ -15,8 +15,7 @@ import os
 import importlib
 import argparse
 import logging
-from typing import Union
-import typer
+from typing import IO, Union
 from fastapi import UploadFile
 import starlette
 from espp2.datamodels import Transactions
@@ -90,7 +89,7 @@ def plugin_read(fd, filename, trans_format):
     logger.info("Importing transactions with importer %s: %s", trans_format, filename)
     return plugin.read(fd, filename)
 
-def normalize(data: Union[UploadFile, typer.FileText, str], broker: str) -> Transactions:
+def normalize(data: Union[UploadFile, IO, str], broker: str) -> Transactions:
     """Normalize transactions"""
     if isinstance(data, str):
         filename = data
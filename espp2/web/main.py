@@ -6,43 +6,103 @@ ESPP2 web server
 # pylint: disable=invalid-name
 
 import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
 from io import StringIO
-import json
 import base64
-from os.path import realpath
+from pathlib import Path
+import orjson
 import uvicorn
-from fastapi import FastAPI, Form, UploadFile, HTTPException
-from pydantic import TypeAdapter
+from fastapi import FastAPI, Form, UploadFile, HTTPException, Response
+from pydantic import BaseModel, TypeAdapter
 from fastapi.staticfiles import StaticFiles
-from fastapi.encoders import jsonable_encoder
-from starlette.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from espp2.main import (
     do_taxes,
     get_zipdata,
     do_holdings,
 )
 from espp2.datamodels import ESPPResponse, Wires, Holdings
+from espp2.fmv import FMV, FMVTypeEnum, DATA_DIR
 
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger()
 
-app = FastAPI()
 
+def preheat_cache():
+    """Load the bundled FMV data files so the first report does not have to"""
+    fmv = FMV()
+    for fmvtype in FMVTypeEnum:
+        prefix = f"{fmvtype}_"
+        for entry in DATA_DIR.iterdir():
+            if entry.name.startswith(prefix) and entry.name.endswith(".json"):
+                fmv.load(fmvtype, entry.name[len(prefix) : -len(".json")])
 
-def capture_logs_start() -> logging.StreamHandler:
-    log_stream = StringIO()
-    log_handler = logging.StreamHandler(log_stream)
-    formatter = logging.Formatter("%(levelname)s: %(message)s")
-    log_handler.setFormatter(formatter)
-    logger.addHandler(log_handler)
-    return log_handler
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Warm up every worker before it starts serving requests"""
+    await run_in_threadpool(preheat_cache)
+    yield
 
-def capture_logs_stop(log_handler) -> str:
-    logger.removeHandler(log_handler)
-    log_handler.flush()
-    log_handler.stream.flush()
-    return log_handler.stream.getvalue()
+
+app = FastAPI(lifespan=lifespan)
+
+_PUBLIC_DIR = Path(__file__).resolve().parent / "public"
+
+# Build the validators once instead of per request
+_HOLDINGS_ADAPTER = TypeAdapter(Holdings)
+_WIRES_ADAPTER = TypeAdapter(Wires)
+
+
+class RequestLogHandler(logging.Handler):
+    """Log handler writing to the log buffer of the current request"""
+
+    def emit(self, record):
+        stream = _log_stream.get()
+        if stream is None:
+            return
+        try:
+            stream.write(self.format(record) + "\n")
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+
+# Per-request log buffer. Context variables follow the request into
+# run_in_threadpool, so concurrent reports do not see each other's logs.
+_log_stream: ContextVar[StringIO | None] = ContextVar("log_stream", default=None)
+_log_handler = RequestLogHandler()
+_log_handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+logger.addHandler(_log_handler)
+
+
+def capture_logs_start() -> Token:
+    return _log_stream.set(StringIO())
+
+
+def capture_logs_stop(token: Token) -> str:
+    log_stream = _log_stream.get()
+    _log_stream.reset(token)
+    return log_stream.getvalue()
+
+
+def json_response(model: BaseModel) -> Response:
+    """Serialize an already validated model straight to the response body.
+    Returning the model itself makes FastAPI validate it again against response_model."""
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def report_zipdata(year: int, holdings: Holdings, exceldata: bytes) -> bytes:
+    """Serialize holdings and build the report zip file"""
+    return get_zipdata(
+        [
+            (
+                f"espp-holdings-{year}.json",
+                holdings.model_dump_json(),
+            ),
+            (f"espp-portfolio-{year}.xlsx", exceldata),
+        ]
+    )
 
 
 @app.post("/taxreport/", response_model=ESPPResponse)
@@ -54,44 +114,47 @@ async def taxreport(
     #        opening_balance: str = Form(...),
     year: int = Form(...),
 ):
-    log_handler = capture_logs_start()
+    log_token = capture_logs_start()
     """File upload endpoint"""
     opening_balance = None
     if wires:
-        wires_list = json.loads(wires)
-        wires = Wires(root=wires_list)
+        wires_list = orjson.loads(wires)
+        wires = _WIRES_ADAPTER.validate_python(wires_list)
 
     if opening_balance:
-        adapter = TypeAdapter(Holdings)
-        opening_balance = adapter.validate_json(opening_balance)
+        opening_balance = _HOLDINGS_ADAPTER.validate_python(
+            orjson.loads(opening_balance)
+        )
 
     if holdfile and holdfile.filename == "":
         holdfile = None
     elif holdfile:
         holdfile = holdfile.file
     try:
-        report, holdings, exceldata, summary = do_taxes(
-            broker, transaction_files, holdfile, wires, year, portfolio_engine=True
+        report, holdings, exceldata, summary = await run_in_threadpool(
+            do_taxes,
+            broker,
+            transaction_files,
+            holdfile,
+            wires,
+            year,
+            portfolio_engine=True,
         )
     except Exception as e:
         logger.exception(e)
         raise HTTPException(status_code=500, detail=str(e)) from e
 
-    zipdata = get_zipdata(
-        [
-            (
-                f"espp-holdings-{year}.json",
-                holdings.model_dump_json(indent=4),
-            ),
-            (f"espp-portfolio-{year}.xlsx", exceldata),
-        ]
-    )
-    zipstr = jsonable_encoder(
-        zipdata, custom_encoder={bytes: lambda v: base64.b64encode(v).decode("utf-8")}
-    )
-    logstr = capture_logs_stop(log_handler)
-    return ESPPResponse(
-        tax_report=report, holdings=holdings, zip=zipstr, summary=summary, log=logstr
+    zipdata = await run_in_threadpool(report_zipdata, year, holdings, exceldata)
+    zipstr = base64.b64encode(zipdata).decode("ascii")
+    logstr = capture_logs_stop(log_token)
+    return json_response(
+        ESPPResponse(
+            tax_report=report,
+            holdings=holdings,
+            zip=zipstr,
+            summary=summary,
+            log=logstr,
+        )
     )
 
 @app.post("/holdings", response_model=Holdings)
@@ -102,34 +165,26 @@ async def generate_holdings(
 ):
     """Generate previous year holdings from a plethora of transaction files"""
     try:
-        return do_holdings(
-            broker, transaction_files, year)
+        holdings = await run_in_threadpool(do_holdings, broker, transaction_files, year)
+        return json_response(holdings)
     except Exception as e:
         logger.exception(e)
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-# This seems to keep us from caching the files too agressively.
-# Is there a simpler way to do cache control serverside?
-# Might require e.g. an nginx proxy?
+class RevalidatingStaticFiles(StaticFiles):
+    """Static files that the browser has to revalidate before using a cached copy.
+    Unchanged files are answered with 304 Not Modified based on ETag/Last-Modified."""
 
-
-@app.get("/bundle.js")
-async def get_bundle():
-    logger.debug("bundle.js")
-    return FileResponse(
-        realpath(f"{realpath(__file__)}/../public/bundle.js"),
-        headers={
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0",
-        },
-    )
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
 
 app.mount(
     "/",
-    StaticFiles(directory=realpath(f"{realpath(__file__)}/../public"), html=True),
+    RevalidatingStaticFiles(directory=_PUBLIC_DIR, html=True),
     name="public",
 )
 
@@ -1,11 +1,72 @@
 # Description: Test the web application
 
+import asyncio
+import base64
+import io
+import logging
+import os
+import zipfile
 from fastapi.testclient import TestClient
-from espp2.web.main import app
+from starlette.concurrency import run_in_threadpool
+from espp2.web.main import app, capture_logs_start, capture_logs_stop
 
 client = TestClient(app)
 
+SCHWAB = os.path.join(os.path.dirname(__file__), "../../test/schwab1.json")
+
+
+def post_transactions(url, **data):
+    with open(SCHWAB, "rb") as f:
+        return client.post(
+            url,
+            files=[("transaction_files", ("schwab1.json", f, "application/json"))],
+            data={"broker": "schwab", "year": "2024", **data},
+        )
+
 
 def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
+
+
+def test_static_revalidation():
+    response = client.get("/")
+    assert response.headers["cache-control"] == "no-cache"
+    response = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_capture_logs_per_request():
+    async def request(name):
+        token = capture_logs_start()
+        for _ in range(3):
+            await run_in_threadpool(logging.getLogger("espp2").error, "from %s", name)
+            await asyncio.sleep(0)
+        return capture_logs_stop(token)
+
+    async def concurrent_requests():
+        return await asyncio.gather(request("a"), request("b"))
+
+    log_a, log_b = asyncio.run(concurrent_requests())
+    assert log_a == "ERROR: from a\n" * 3
+    assert log_b == "ERROR: from b\n" * 3
+
+
+def test_taxreport():
+    response = post_transactions("/taxreport/", wires="[]")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    result = response.json()
+    assert set(result) == {"zip", "tax_report", "summary", "holdings", "log"}
+    assert result["holdings"]["year"] == 2024
+    with zipfile.ZipFile(io.BytesIO(base64.b64decode(result["zip"]))) as z:
+        assert z.namelist() == ["espp-holdings-2024.json", "espp-portfolio-2024.xlsx"]
+
+
+def test_holdings():
+    response = post_transactions("/holdings")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    result = response.json()
+    assert set(result) == {"year", "broker", "stocks", "cash"}
+    assert result["year"] == 2023
@@ -0,0 +1,40 @@
+from datetime import date
+import json
+import threading
+import time
+from espp2.fmv import FMV, FMVTypeEnum
+
+
+def test_concurrent_refresh(tmp_path, monkeypatch):
+    """Concurrent lookups of stale data fetch once and leave a complete cache file"""
+    fmv = FMV()
+    fetches = []
+
+    def fetch(_self, symbol):
+        fetches.append(symbol)
+        time.sleep(0.1)
+        return {"2025-04-23": {"value": 0.41}}
+
+    monkeypatch.setitem(fmv.fetchers, FMVTypeEnum.DIVIDENDS, fetch)
+    monkeypatch.setattr(
+        FMV,
+        "get_filename",
+        lambda self, fmvtype, symbol: f"{tmp_path}/{fmvtype}_{symbol}.json",
+    )
+    monkeypatch.setitem(fmv.table, FMVTypeEnum.DIVIDENDS, {})
+
+    threads = [
+        threading.Thread(
+            target=fmv.refresh, args=("TEST", date(2025, 4, 23), FMVTypeEnum.DIVIDENDS)
+        )
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert fetches == ["TEST"]
+    with open(tmp_path / "DIVIDENDS_TEST.json", encoding="utf-8") as f:
+        assert json.load(f)["2025-04-23"] == {"value": 0.41}
+    assert list(tmp_path.iterdir()) == [tmp_path / "DIVIDENDS_TEST.json"]
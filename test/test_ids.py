@@ -0,0 +1,25 @@
+import sys
+import threading
+from types import SimpleNamespace
+from espp2.datamodels import get_id
+
+
+def test_concurrent_ids_unique():
+    """Transactions created by concurrent reports never share an id"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    entry = SimpleNamespace(source="test-ids", date="2024-01-02", type="BUY", qty=1)
+    ids = []
+
+    def create():
+        ids.extend([get_id(entry) for _ in range(2000)])
+
+    try:
+        threads = [threading.Thread(target=create) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(set(ids)) == len(ids)
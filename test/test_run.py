@@ -0,0 +1,37 @@
+import io
+import json
+import os
+import zipfile
+from espp2.main import run
+from espp2.datamodels import Holdings
+
+SCHWAB = os.path.join(os.path.dirname(__file__), "schwab1.json")
+
+
+def test_run_file_names(tmp_path):
+    holdings = tmp_path / "holdings-2024.json"
+    output = tmp_path / "calc-2024.zip"
+    result = run([SCHWAB], 2024, outholdings=str(holdings), output=output)
+
+    text = holdings.read_text(encoding="utf-8")
+    assert text == result.holdings.model_dump_json()
+    assert Holdings.model_validate_json(text).year == 2024
+    with zipfile.ZipFile(output) as z:
+        assert z.namelist() == ["espp-holdings-2024.json", "espp-portfolio-2024.xlsx"]
+
+
+def test_run_open_files():
+    wires = io.StringIO("[]")
+    holdings = io.StringIO()
+    with open(SCHWAB, "rb") as tf:
+        run([tf], 2024, wires=wires, outholdings=holdings)
+        assert not tf.closed
+    assert not wires.closed
+    assert not holdings.closed
+    assert json.loads(holdings.getvalue())["year"] == 2024
+
+
+def test_run_pretty(tmp_path):
+    holdings = tmp_path / "holdings-2024.json"
+    run([SCHWAB], 2024, outholdings=holdings, indent=4)
+    assert holdings.read_text(encoding="utf-8").startswith('{\n    "year": 2024')